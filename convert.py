@@ -1,73 +1,88 @@
+import os
 import re
 import xml
 import xml.etree.ElementTree as ET
-from typing import List
-
-
-def load_and_process_xml(file_path: str) -> list[str | None]:
-    # Opening and parsing the XML file
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+# Apple DictionaryService and XHTML names in Clark notation, as ElementTree reports them
+DICTIONARY_NS = "http://www.apple.com/DTDs/DictionaryService-1.0.rng"
+ENTRY_TAG = f"{{{DICTIONARY_NS}}}entry"
+TITLE_ATTR = f"{{{DICTIONARY_NS}}}title"
+LINK_TAG = "{http://www.w3.org/1999/xhtml}a"
+
+# Characters that cannot appear in a filename, mapped in one str.translate pass
+FILENAME_TRANSLATION = str.maketrans({"/": "_", "\\": "_", ":": "_"})
+# Section classes look like x_xd1, x_xo0; compiled once, matched per element
+SECTION_PATTERN = re.compile(r"^x_x([a-zA-Z][a-zA-Z\d]*?)(\d*)$")
+# Classes rendered in italic: examples, glosses, register labels
+ITALIC_CLASSES = frozenset({"ex", "ge", "reg"})
+# (filename, markdown, error): either the first two or only error is set
+RenderedEntry = tuple[str | None, str | None, str | None]
+# Entries sent to a worker per task, and tasks in flight in the pool at once
+RENDER_CHUNK_SIZE = 64
+RENDER_WINDOW_CHUNKS = 64
+
+
+def load_and_process_xml(file_path: str) -> Iterator[str]:
+    # Streaming the XML file so the whole dictionary tree is never held in memory
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-
-        # Define the namespace map
-        namespaces = {"d": "http://www.apple.com/DTDs/DictionaryService-1.0.rng"}
-
-        # Extract elements within the <d:dictionary> tag using the appropriate namespace
-        dictionary_entries = []
+        context = ET.iterparse(file_path, events=("start", "end"))
+        # The first event is the start of the root <d:dictionary> element
+        _, root = next(context)
 
         # Processing all <d:entry> elements to ensure they have a non-empty d:title attribute
-        for entry in root.findall(".//d:entry", namespaces=namespaces):
-            title = entry.get(
-                "{http://www.apple.com/DTDs/DictionaryService-1.0.rng}title"
-            )
+        for event, entry in context:
+            if event != "end" or entry.tag != ENTRY_TAG:
+                continue
+            title = entry.get(TITLE_ATTR)
             # Check if title exists and is not just whitespace
             if title is not None and title.strip():
-                entry_string = ET.tostring(entry, encoding="unicode")
-                dictionary_entries.append(entry_string)
-
-        # Return list of entry strings
-        return dictionary_entries
+                # Yield entry strings one at a time instead of collecting a list
+                yield ET.tostring(entry, encoding="unicode")
+            # Drop the finished entry (and anything before it) from the tree
+            root.clear()
 
     except Exception as e:
         print(f"An error occurred: {e}")
-        return []
 
 
 def find_matching_item(
-    items: List, pattern: str
+    items: List, pattern: re.Pattern
 ) -> tuple[str, re.Match] | tuple[None, None]:
     """Search for an item in the list that matches the given regex pattern and return it."""
     for item in items:
-        if matched := re.match(pattern, item):
+        if matched := pattern.match(item):
             return item, matched
     return tuple([None, None])
 
 
 def convert_to_markdown(elem, depth=0):
     # This function recursively converts XML content to Markdown
-    markdown = ""
-
-    # Process child elements first (depth-first)
-    for child in elem:
-        markdown += convert_to_markdown(child, depth + 1)
+    # Process child elements first (depth-first), joining once instead of +=
+    markdown = "".join([convert_to_markdown(child, depth + 1) for child in elem])
 
     # Process the current element
     # Check for class attributes/classes or specific tags
     tag = elem.tag
-    class_attr = elem.get("class", "").split(" ")
-    text = elem.text if elem.text is not None else ""
-    tail_text = elem.tail if elem.tail is not None and depth > 0 else ""
+    class_string = elem.attrib.get("class") or ""
+    # Many elements carry no class; skip the split and its list allocation for them
+    class_attr = class_string.split(" ") if class_string else ()
+    text = elem.text or ""
+    # The entry root's tail lies outside the entry, so only children keep theirs
+    tail_text = (elem.tail or "") if depth > 0 else ""
 
     # markdown is the content of child elements
     # text is the content of the current element
     # in each element, content is organized, allegedly, text + markdown(from children) + tail_text
 
     # italic
-    if "ex" in class_attr or "ge" in class_attr or "reg" in class_attr:
+    if not ITALIC_CLASSES.isdisjoint(class_attr):
         markdown = f"*{(text + markdown + tail_text).strip()}* "
     # internal link
-    elif tag == "{http://www.w3.org/1999/xhtml}a":
+    elif tag == LINK_TAG:
         markdown = f"[[{(text + markdown + tail_text).strip()}]]"
     # bold
     elif "l" in class_attr:
@@ -76,10 +91,11 @@ def convert_to_markdown(elem, depth=0):
         markdown = text + markdown + tail_text
 
     # section
-    # Pattern to match
-    pattern = r"^x_x([a-zA-Z][a-zA-Z\d]*?)(\d*)$"
+    # Only class strings containing "x_x" can match, so skip the regex scan otherwise
+    if "x_x" not in class_string:
+        return markdown
     # Find matching item
-    matched_item, matched_section = find_matching_item(class_attr, pattern)
+    matched_item, matched_section = find_matching_item(class_attr, SECTION_PATTERN)
     if matched_item:
         (matched_section_type, matched_section_indent) = matched_section.groups()
         if matched_section_indent is not None and "sn" not in class_attr:
@@ -89,43 +105,85 @@ def convert_to_markdown(elem, depth=0):
     return markdown
 
 
-def save_entry_to_md(entry_xml: str):
+def render_entry(entry_xml: str) -> RenderedEntry:
+    """Parse one serialized entry and return (filename, markdown, error)."""
+    # Runs in worker processes, so problems are returned for the parent to print
+    # in entry order rather than printed here
     try:
         # Parse the entry XML string
         entry: xml.etree.ElementTree = ET.fromstring(entry_xml)
 
         # Extract the title attribute for use as the filename
-        title = entry.get("{http://www.apple.com/DTDs/DictionaryService-1.0.rng}title")
+        title = entry.get(TITLE_ATTR)
 
         if title is None or not title.strip():
-            print("Entry is missing a valid 'd:title'. Skipping file creation.")
-            return
+            error = "Entry is missing a valid 'd:title'. Skipping file creation."
+            return None, None, error
 
         # Clean title to create a valid filename
-        filename = (
-            title.strip().replace("/", "_").replace("\\", "_").replace(":", "_") + ".md"
-        )
+        filename = title.strip().translate(FILENAME_TRANSLATION) + ".md"
+        return filename, convert_to_markdown(entry), None
+
+    except ET.ParseError:
+        return None, None, "Failed to parse the XML entry. Ensure it's well-formed."
+    except Exception as e:
+        return None, None, f"An error occurred: {e}"
+
+
+def write_markdown(filename: str, markdown: str):
+    try:
         print(f"Creating file '{filename}'...")
 
         # Create and write to a Markdown file
         with open(filename, "w", encoding="utf-8") as file:
-            file.write(convert_to_markdown(entry))
+            file.write(markdown)
 
         print(f"File '{filename}' has been created successfully.")
 
-    except ET.ParseError:
-        print("Failed to parse the XML entry. Ensure it's well-formed.")
     except Exception as e:
         print(f"An error occurred: {e}")
 
 
-# Define the file path
-file_path = "Oxford Dictionary of English.xml"
-
-# Process the XML and store results
-dictionary_contents = load_and_process_xml(file_path)
-
-# Output the results
-print(f"Number of entries: {len(dictionary_contents)}")
-for content in dictionary_contents:
-    save_entry_to_md(content)
+def render_chunk(entries: list[str]) -> list[RenderedEntry]:
+    """Render a chunk of entries in one worker call, amortizing pickling and IPC."""
+    return [render_entry(entry) for entry in entries]
+
+
+def render_entries(entries: Iterable[str]) -> Iterator[RenderedEntry]:
+    """Render entries in input order, in worker processes when several CPUs exist."""
+    if (os.cpu_count() or 1) < 2:
+        yield from map(render_entry, entries)
+        return
+    entries = iter(entries)
+    with ProcessPoolExecutor() as executor:
+        # Executor.map submits its whole input up front, so keep a bounded window
+        # of in-flight chunks instead; it is topped up as the oldest result is
+        # yielded, so parsing and rendering overlap and input order is kept
+        pending = deque()
+        while chunk := list(islice(entries, RENDER_CHUNK_SIZE)):
+            pending.append(executor.submit(render_chunk, chunk))
+            if len(pending) >= RENDER_WINDOW_CHUNKS:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+if __name__ == "__main__":
+    # Define the file path
+    file_path = "Oxford Dictionary of English.xml"
+
+    # Process the XML as a stream of entry strings
+    dictionary_contents = load_and_process_xml(file_path)
+
+    # Files are written here in entry order so entries sharing a title still
+    # resolve last-one-wins, as in a sequential run
+    entry_count = 0
+    for filename, markdown, error in render_entries(dictionary_contents):
+        entry_count += 1
+        if error is not None:
+            print(error)
+        else:
+            write_markdown(filename, markdown)
+
+    # Output the results
+    print(f"Number of entries: {entry_count}")